@@ -6,12 +6,33 @@ stuff should be encapsulated in this module.
 """
 import logging
 
+from annotator import authz
+from elasticsearch import exceptions as elasticsearch_exceptions
 import webob.multidict
 
+from h import util
 from h.api import models
 
 log = logging.getLogger(__name__)
 
+# The maximum number of queries to keep in the build_query() cache.
+QUERY_CACHE_SIZE = 512
+
+# build_query() results, keyed on the request params they were built from.
+_query_cache = util.BoundedCache(QUERY_CACHE_SIZE)
+
+
+def _es_client():
+    """Return the Elasticsearch client shared by the annotation store.
+
+    annotator-store connects lazily on first use and then keeps the same
+    client (and its pool of HTTP connections) for the life of the process,
+    so callers should always go through this rather than constructing their
+    own ``elasticsearch.Elasticsearch`` instances.
+
+    """
+    return models.Annotation.es.conn
+
 
 def _match_clause_for_uri(uri):
     """Return an Elasticsearch match clause dict for the given URI."""
@@ -49,54 +70,72 @@ def build_query(request_params):
     :rtype: dict
 
     """
-    # NestedMultiDict objects are read-only, so we need to copy to make it
-    # modifiable.
-    request_params = request_params.copy()
+    # Queries for a "uri" param depend on the Documents currently in the
+    # database, so they can't be cached.
+    if "uri" in request_params:
+        return _build_query(request_params)
 
-    try:
-        from_ = int(request_params.pop("offset"))
-        if from_ < 0:
-            raise ValueError
-    except (ValueError, KeyError):
-        from_ = 0
+    # Callers get a shallow copy, so they can replace the top-level "query",
+    # "sort", etc. but must not modify the nested dicts.
+    return _query_cache.get(tuple(request_params.items()),
+                            lambda: _build_query(request_params))
 
+
+def _non_negative_int(value, default):
+    """Return value as an int, or default if it isn't a non-negative int."""
     try:
-        size = int(request_params.pop("limit"))
-        if size < 0:
-            raise ValueError
-    except (ValueError, KeyError):
-        size = 20
+        value = int(value)
+    except (TypeError, ValueError):
+        return default
+    if value < 0:
+        return default
+    return value
+
+
+def _build_query(request_params):
+    # Sort the params into the ones that control the search and the fields
+    # to match, in a single pass over the (read-only) NestedMultiDict.
+    params = {}
+    keywords = []
+    field_matches = []
+    for key, value in request_params.items():
+        if key in ("offset", "limit", "sort", "order", "uri"):
+            # The first value wins; repeats are ignored rather than being
+            # matched against an annotation field of the same name.
+            params.setdefault(key, value)
+        elif key == "any":
+            keywords.append(value)
+        else:
+            field_matches.append({"match": {key: value}})
 
     query = {
-        "from": from_,
-        "size": size,
+        "from": _non_negative_int(params.get("offset"), 0),
+        "size": _non_negative_int(params.get("limit"), 20),
         "sort": [
             {
-                request_params.pop("sort", "updated"): {
+                params.get("sort", "updated"): {
                     "ignore_unmapped": True,
-                    "order": request_params.pop("order", "desc")
+                    "order": params.get("order", "desc")
                 }
             }
         ]
     }
 
     matches = []
-    uri_match_clause = _match_clause_for_uri(request_params.pop("uri", None))
+    uri_match_clause = _match_clause_for_uri(params.get("uri"))
     if uri_match_clause:
         matches.append(uri_match_clause)
 
-    if "any" in request_params:
+    if keywords:
         matches.append({
             "multi_match": {
                 "fields": ["quote", "tags", "text", "uri.parts", "user"],
-                "query": request_params.getall("any"),
+                "query": keywords,
                 "type": "cross_fields"
             }
         })
-        del request_params["any"]
 
-    for key, value in request_params.items():
-        matches.append({"match": {key: value}})
+    matches.extend(field_matches)
     matches = matches or [{"match_all": {}}]
 
     query["query"] = {"bool": {"must": matches}}
@@ -104,6 +143,85 @@ def build_query(request_params):
     return query
 
 
+def _as_bool_filter(filter_):
+    """Return the given filter with any "and" and "or" filters made "bool".
+
+    Elasticsearch 1.x caches the results of leaf "term" filters as bitsets,
+    but caches neither "bool" nor "and"/"or" filters by default. What "bool"
+    gains is that it combines the cached bitsets of its leaf filters, while
+    "and" and "or" check documents against their clauses one at a time. The
+    permissions filter for anonymous users is a single "term" filter; for
+    logged-in users it's a tree of "and"/"or" filters over "term" filters.
+
+    """
+    if "or" in filter_:
+        return {"bool": {"should": [_as_bool_filter(f)
+                                    for f in filter_["or"]]}}
+    if "and" in filter_:
+        return {"bool": {"must": [_as_bool_filter(f)
+                                  for f in filter_["and"]]}}
+    return filter_
+
+
+def _filtered_query(query, user):
+    """Return the given query restricted to annotations the user may read.
+
+    This applies the same permissions filter that
+    Annotation.search_raw() would apply, for use with requests that we send
+    to Elasticsearch ourselves.
+
+    """
+    if not models.Annotation.es.authorization_enabled:
+        return query
+
+    permissions_filter = authz.permissions_filter(user)
+    if not permissions_filter:
+        raise RuntimeError("Authorization filter creation failed")
+
+    filtered_query = dict(query)
+    filtered_query["query"] = {
+        "filtered": {
+            "filter": _as_bool_filter(permissions_filter),
+            "query": query["query"]
+        }
+    }
+    return filtered_query
+
+
+def _search_with_count(query):
+    """Return the annotations matching query and the total number of matches.
+
+    The page of results and the total count are fetched with a single
+    multi-search request, rather than a search request followed by a
+    separate count request.
+
+    :returns: a (rows, total) tuple, where rows is a list of
+        models.Annotation objects and total is an int
+    :rtype: tuple
+
+    """
+    # The count only needs the total number of hits, so leave out the
+    # paging and sorting and don't fetch any documents.
+    count_query = {"query": query["query"], "size": 0}
+    body = [{}, query, {"search_type": "count"}, count_query]
+    responses = _es_client().msearch(body=body,
+                                     index=models.Annotation.es.index,
+                                     doc_type=models.Annotation.__type__)
+    results, count = responses["responses"]
+
+    # An error in a multi-search sub-response is just a string, and may be a
+    # shard or availability failure as well as a bad query, so don't claim
+    # it's a 400.
+    for response in (results, count):
+        if "error" in response:
+            raise elasticsearch_exceptions.TransportError(
+                500, response["error"], response)
+
+    rows = [models.Annotation(hit["_source"], id=hit["_id"])
+            for hit in results["hits"]["hits"]]
+    return rows, count["hits"]["total"]
+
+
 def search(request_params, user=None):
     """Search with the given params and return the matching annotations.
 
@@ -124,10 +242,8 @@ def search(request_params, user=None):
               request_params.get('uri'))
 
     query = build_query(request_params)
-    results = models.Annotation.search_raw(query, user=user)
-    count = models.Annotation.search_raw(query, {'search_type': 'count'},
-                                         raw_result=True)
-    return {"rows": results, "total": count["hits"]["total"]}
+    rows, total = _search_with_count(_filtered_query(query, user))
+    return {"rows": rows, "total": total}
 
 
 def index(user=None):
@@ -1,9 +1,18 @@
+from annotator import elasticsearch as annotator_es
+from elasticsearch import exceptions as elasticsearch_exceptions
 import mock
+import pytest
 from webob import multidict
 
 from h.api import search
 
 
+@pytest.fixture(autouse=True)
+def clear_query_cache():
+    """Don't let queries cached by one test leak into another."""
+    search._query_cache.clear()
+
+
 def test_build_query_offset_defaults_to_0():
     """If no offset is given then "from": 0 is used in the query by default."""
     query = search.build_query(
@@ -232,6 +241,29 @@ def test_build_query_with_multiple_keywords():
     }
 
 
+def test_build_query_with_keywords_and_other_params():
+    """Keywords come before other matches, wherever they are in the params."""
+    params = multidict.MultiDict()
+    params.add("user", "bob")
+    params.add("any", "howdy")
+    params.add("limit", "5")
+    params.add("any", "there")
+
+    query = search.build_query(request_params=params)
+
+    assert query["size"] == 5
+    assert query["query"] == {
+        "bool": {"must": [
+            {"multi_match": {
+                "fields": ["quote", "tags", "text", "uri.parts", "user"],
+                "query": ["howdy", "there"],
+                "type": "cross_fields"
+            }},
+            {"match": {"user": "bob"}},
+        ]}
+    }
+
+
 @mock.patch("h.api.search.models")
 def test_build_query_for_uri(models):
     """'uri' args are returned in the query dict in a "match" clause.
@@ -338,6 +370,55 @@ def test_build_query_with_multiple_quote_params():
     }
 
 
+def test_build_query_ignores_repeated_control_params():
+    """Only the first value of a repeated control param is used."""
+    params = multidict.MultiDict()
+    params.add("offset", "1")
+    params.add("offset", "2")
+    params.add("sort", "created")
+    params.add("sort", "user")
+
+    query = search.build_query(request_params=params)
+
+    assert query["from"] == 1
+    assert query["sort"] == [
+        {"created": {"ignore_unmapped": True, "order": "desc"}}]
+    assert query["query"] == {"bool": {"must": [{"match_all": {}}]}}
+
+
+def test_build_query_reuses_the_query_for_the_same_params():
+    first = search.build_query(
+        request_params=multidict.NestedMultiDict({"tags": "cached"}))
+    second = search.build_query(
+        request_params=multidict.NestedMultiDict({"tags": "cached"}))
+
+    assert first == second
+    assert first is not second
+    assert first["query"] is second["query"]
+
+
+@mock.patch("h.api.search.models")
+def test_build_query_does_not_cache_uri_queries(models):
+    """Queries for a URI must reflect the current Documents in the db."""
+    models.Document.get_by_uri.return_value = None
+    params = multidict.NestedMultiDict({"uri": "http://example.com/"})
+
+    search.build_query(request_params=params)
+    search.build_query(request_params=params)
+
+    assert models.Document.get_by_uri.call_count == 2
+
+
+@mock.patch.object(search._query_cache, "maxsize", 1)
+def test_build_query_cache_is_bounded():
+    search.build_query(
+        request_params=multidict.NestedMultiDict({"tags": "one"}))
+    search.build_query(
+        request_params=multidict.NestedMultiDict({"tags": "two"}))
+
+    assert len(search._query_cache) == 1
+
+
 def test_build_query_with_evil_arguments():
     params = multidict.NestedMultiDict({
         "offset": "3foo",
@@ -349,21 +430,110 @@ def test_build_query_with_evil_arguments():
     assert query["query"] == {'bool': {'must': [{'match_all': {}}]}}
 
 
-@mock.patch("annotator.annotation.Annotation.search_raw")
-def test_search_with_user_object(search_raw):
-    """If search() gets a user arg it passes it to search_raw().
+def _msearch_response(hits=None, total=0):
+    """Return a fake Elasticsearch multi-search response."""
+    return {
+        "responses": [
+            {"hits": {"hits": hits or [], "total": total}},
+            {"hits": {"hits": [], "total": total}},
+        ]
+    }
+
+
+@mock.patch("h.api.search.authz")
+@mock.patch("h.api.search._es_client")
+def test_search_with_user_object(es_client, authz):
+    """If search() gets a user arg it filters the results for that user.
 
     Note: This test is testing the function's user param. You can also
     pass one or more user arguments in the request.params, those are
     tested elsewhere.
 
     """
+    es_client.return_value.msearch.return_value = _msearch_response()
     user = mock.MagicMock()
 
-    search.search(request_params=multidict.NestedMultiDict(), user=user)
+    with mock.patch("h.api.search.models.Annotation.es") as es:
+        es.authorization_enabled = True
+        search.search(request_params=multidict.NestedMultiDict(), user=user)
+
+    authz.permissions_filter.assert_called_once_with(user)
+    body = es_client.return_value.msearch.call_args[1]["body"]
+    for query in (body[1], body[3]):
+        assert query["query"]["filtered"]["filter"] == (
+            authz.permissions_filter.return_value)
+
+
+def test_as_bool_filter_leaves_term_filters_alone():
+    term = {"term": {"permissions.read": "group:__world__"}}
+
+    assert search._as_bool_filter(term) == term
+
+
+def test_as_bool_filter_converts_and_and_or_filters_to_bool():
+    filter_ = {"or": [
+        {"term": {"permissions.read": "group:__world__"}},
+        {"and": [{"term": {"consumer": "foo"}},
+                 {"term": {"user": "acct:bob@example.com"}}]}
+    ]}
+
+    assert search._as_bool_filter(filter_) == {"bool": {"should": [
+        {"term": {"permissions.read": "group:__world__"}},
+        {"bool": {"must": [{"term": {"consumer": "foo"}},
+                           {"term": {"user": "acct:bob@example.com"}}]}}
+    ]}}
+
+
+@mock.patch("h.api.search._es_client")
+def test_search_sends_a_single_multi_search_request(es_client):
+    """search() fetches the results and the count in one request."""
+    es_client.return_value.msearch.return_value = _msearch_response()
+
+    search.search(request_params=multidict.NestedMultiDict())
+
+    assert es_client.return_value.msearch.call_count == 1
+    body = es_client.return_value.msearch.call_args[1]["body"]
+    assert body[0] == {}
+    assert body[2] == {"search_type": "count"}
+    assert body[3]["query"] == body[1]["query"]
 
-    first_call = search_raw.call_args_list[0]
-    assert first_call[1]["user"] == user
+
+@mock.patch("h.api.search._es_client")
+def test_search_count_query_has_no_paging_or_sorting(es_client):
+    es_client.return_value.msearch.return_value = _msearch_response()
+
+    search.search(request_params=multidict.NestedMultiDict({"offset": 20}))
+
+    body = es_client.return_value.msearch.call_args[1]["body"]
+    assert "sort" not in body[3]
+    assert "from" not in body[3]
+    assert body[3]["size"] == 0
+
+
+@mock.patch("h.api.search._es_client")
+def test_search_returns_rows_and_total(es_client):
+    es_client.return_value.msearch.return_value = _msearch_response(
+        hits=[{"_id": "abc", "_source": {"text": "foo"}}], total=42)
+
+    result = search.search(request_params=multidict.NestedMultiDict())
+
+    assert result["rows"] == [{"id": "abc", "text": "foo"}]
+    assert result["total"] == 42
+
+
+@mock.patch("h.api.search._es_client")
+def test_search_raises_if_elasticsearch_returns_an_error(es_client):
+    es_client.return_value.msearch.return_value = {
+        "responses": [{"error": "SearchPhaseExecutionException"},
+                      {"error": "SearchPhaseExecutionException"}]
+    }
+
+    with pytest.raises(elasticsearch_exceptions.TransportError) as exc:
+        search.search(request_params=multidict.NestedMultiDict())
+
+    assert exc.value.status_code == 500
+    assert exc.value.error == "SearchPhaseExecutionException"
+    assert exc.value.info == {"error": "SearchPhaseExecutionException"}
 
 
 @mock.patch("h.api.search.search")
@@ -373,3 +543,13 @@ def test_index_limit_is_20(search_func):
 
     first_call = search_func.call_args_list[0]
     assert first_call[0][0]["limit"] == 20
+
+
+def test_es_client_returns_the_shared_store_connection():
+    """_es_client() reuses annotator-store's connection on every call."""
+    store = annotator_es.ElasticSearch()
+    store._connection = mock.sentinel.connection
+
+    with mock.patch.object(search.models.Annotation, "es", store):
+        assert search._es_client() is mock.sentinel.connection
+        assert search._es_client() is mock.sentinel.connection
@@ -36,28 +36,30 @@ def index(context, request):
 
     Clients may use this to discover endpoints for the API.
     """
+    annotations_url = request.resource_url(context, 'annotations')
+    annotation_url = annotations_url + '/:id'
     return {
         'message': "Annotator Store API",
         'links': {
             'annotation': {
                 'create': {
                     'method': 'POST',
-                    'url': request.resource_url(context, 'annotations'),
+                    'url': annotations_url,
                     'desc': "Create a new annotation"
                 },
                 'read': {
                     'method': 'GET',
-                    'url': request.resource_url(context, 'annotations', ':id'),
+                    'url': annotation_url,
                     'desc': "Get an existing annotation"
                 },
                 'update': {
                     'method': 'PUT',
-                    'url': request.resource_url(context, 'annotations', ':id'),
+                    'url': annotation_url,
                     'desc': "Update an existing annotation"
                 },
                 'delete': {
                     'method': 'DELETE',
-                    'url': request.resource_url(context, 'annotations', ':id'),
+                    'url': annotation_url,
                     'desc': "Delete an annotation"
                 }
             },
@@ -263,14 +265,11 @@ def _anonymize_deletes(annotation):
     user = annotation.pop('user')
 
     # Remove the user from the permissions, but keep any others in place.
+    # Most role lists won't mention the user, so only rebuild those that do.
     permissions = annotation.get('permissions', {})
-    for action in permissions.keys():
-        filtered = [
-            role
-            for role in annotation['permissions'][action]
-            if role != user
-        ]
-        annotation['permissions'][action] = filtered
+    for action, roles in permissions.items():
+        if user in roles:
+            permissions[action] = [role for role in roles if role != user]
 
 
 def includeme(config):
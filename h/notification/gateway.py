@@ -1,10 +1,11 @@
 # -*- coding: utf-8 -*-
-import re
 from h.accounts import models
 
 
 def user_name(user):
-    return re.search(r'^acct:([^@]+)', user).group(1)
+    if not user.startswith('acct:'):
+        raise ValueError('Invalid user: {}'.format(user))
+    return user[len('acct:'):].partition('@')[0]
 
 
 def user_profile_url(request, user):
@@ -2,7 +2,7 @@
 import sqlalchemy as sa
 from sqlalchemy import func, and_
 
-from h.db import Base
+from h.db import Base, Session
 
 
 class Subscriptions(Base):
@@ -20,13 +20,19 @@ class Subscriptions(Base):
         return cls.query.filter(cls.id == id).first()
 
     @classmethod
-    def get_active_subscriptions_for_a_type(cls, ttype):
-        return cls.query.filter(
+    def get_active_uris_for_a_type(cls, ttype):
+        """Return an iterator over the URIs of active subscriptions of a type.
+
+        Only the uri column is read, in batches, without loading whole
+        Subscriptions objects.
+        """
+        query = Session.query(cls.uri).filter(
             and_(
                 cls.active,
                 func.lower(cls.type) == func.lower(ttype)
             )
-        ).all()
+        )
+        return (uri for (uri,) in query.yield_per(1000))
 
     @classmethod
     def get_subscriptions_for_uri(cls, uri):
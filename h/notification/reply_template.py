@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 import logging
 import re
+import time
 from datetime import datetime
 
 from pyramid.events import subscriber
@@ -22,6 +23,11 @@ TXT_TEMPLATE = ROOT_PATH + 'reply_notification.txt'
 HTML_TEMPLATE = ROOT_PATH + 'reply_notification.html'
 SUBJECT_TEMPLATE = ROOT_PATH + 'reply_notification_subject.txt'
 
+# How long (in seconds) to reuse the set of users with a reply subscription.
+SUBSCRIBERS_CACHE_TTL = 60
+
+_subscribers_cache = {'uris': frozenset(), 'timestamp': 0}
+
 
 def parent_values(annotation):
     if 'references' in annotation:
@@ -105,11 +111,34 @@ def check_conditions(annotation, data):
     return True
 
 
+def _reply_subscribers():
+    """Return the URIs of the users with an active reply subscription.
+
+    The set is reloaded from the database at most once every
+    SUBSCRIBERS_CACHE_TTL seconds, so someone who has only just subscribed
+    may miss notifications for a short while. It's only used to rule users
+    out: subscriptions for users in the set are still read from the database
+    before anything is sent.
+
+    """
+    now = time.time()
+    if now - _subscribers_cache['timestamp'] > SUBSCRIBERS_CACHE_TTL:
+        _subscribers_cache['uris'] = frozenset(
+            Subscriptions.get_active_uris_for_a_type(types.REPLY_TYPE))
+        _subscribers_cache['timestamp'] = now
+    return _subscribers_cache['uris']
+
+
 def generate_notifications(request, annotation, action):
     # And for them we need only the creation action
     if action != 'create':
         return
 
+    # Most annotations aren't replies, and only replies can notify anyone, so
+    # check for that before doing anything else.
+    if not annotation.get('references'):
+        return
+
     # Check for authorization. Send notification only for public annotation
     # XXX: This will be changed and fine grained when
     # user groups will be introduced
@@ -121,9 +150,17 @@ def generate_notifications(request, annotation, action):
         'parent': parent_values(annotation)
     }
 
-    subscriptions = Subscriptions.get_active_subscriptions_for_a_type(
-        types.REPLY_TYPE)
+    # Rule out replies to users without a subscription without going to the
+    # database.
+    parent_user = data['parent'].get('user')
+    if parent_user not in _reply_subscribers():
+        return
+
+    subscriptions = Subscriptions.get_templates_for_uri_and_type(
+        parent_user, types.REPLY_TYPE)
     for subscription in subscriptions:
+        if not subscription.active:
+            continue
         data['subscription'] = subscription.__json__(request)
 
         # Validate annotation
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from h.notification import models
+from h.notification.types import REPLY_TYPE
+
+
+def test_get_active_uris_for_a_type(db_session):
+    db_session.add_all([
+        models.Subscriptions(uri='acct:alice@example.com',
+                             type=REPLY_TYPE,
+                             active=True),
+        models.Subscriptions(uri='acct:bob@example.com',
+                             type=REPLY_TYPE,
+                             active=False),
+        models.Subscriptions(uri='acct:carol@example.com',
+                             type='other',
+                             active=True),
+    ])
+    db_session.flush()
+
+    uris = models.Subscriptions.get_active_uris_for_a_type(REPLY_TYPE)
+
+    assert list(uris) == ['acct:alice@example.com']
@@ -337,19 +337,80 @@ def test_action_update():
         assert mock_parent.call_count == 0
 
 
-def test_action_create():
+@patch('h.notification.reply_template._reply_subscribers')
+@patch('h.notification.reply_template.principals_allowed_by_permission')
+def test_no_work_done_for_annotations_that_are_not_replies(mock_principals,
+                                                           mock_subscribers):
+    """Non-replies return before any permission or subscription checks"""
+    request = _create_request()
+    with patch('h.notification.reply_template.parent_values') as mock_parent:
+        msgs = rt.generate_notifications(request, store_fake_data[0], 'create')
+        with raises(StopIteration):
+            msgs.next()
+        assert not mock_parent.called
+    assert not mock_principals.called
+    assert not mock_subscribers.called
+
+
+@patch('h.notification.reply_template._reply_subscribers')
+def test_action_create(mock_subscribers):
     """If the action is create, it'll try to get the subscriptions"""
+    mock_subscribers.return_value = frozenset(['acct:elephant@nomouse.pls'])
+    with patch('h.notification.reply_template.Annotation') as mock_annotation:
+        mock_annotation.fetch = MagicMock(side_effect=fake_fetch)
+        request = _create_request()
+
+        annotation = store_fake_data[1]
+        with patch('h.notification.reply_template.Subscriptions') as mock_subs:
+            mock_subs.get_templates_for_uri_and_type.return_value = []
+            msgs = rt.generate_notifications(request, annotation, 'create')
+            with raises(StopIteration):
+                msgs.next()
+            mock_subs.get_templates_for_uri_and_type.assert_called_with(
+                'acct:elephant@nomouse.pls', REPLY_TYPE)
+
+
+@patch('h.notification.reply_template._reply_subscribers')
+def test_no_subscription_lookup_if_parent_user_is_not_subscribed(
+        mock_subscribers):
+    """If the parent's user has no subscription the db isn't queried"""
+    mock_subscribers.return_value = frozenset()
     with patch('h.notification.reply_template.Annotation') as mock_annotation:
         mock_annotation.fetch = MagicMock(side_effect=fake_fetch)
         request = _create_request()
 
         annotation = store_fake_data[1]
         with patch('h.notification.reply_template.Subscriptions') as mock_subs:
-            mock_subs.get_active_subscriptions_for_a_type.return_value = []
             msgs = rt.generate_notifications(request, annotation, 'create')
             with raises(StopIteration):
                 msgs.next()
-            assert mock_subs.get_active_subscriptions_for_a_type.called
+            assert not mock_subs.get_templates_for_uri_and_type.called
+
+
+@patch.dict(rt._subscribers_cache, {'uris': frozenset(), 'timestamp': 0})
+def test_reply_subscribers_are_cached():
+    with patch('h.notification.reply_template.Subscriptions') as mock_subs:
+        mock_subs.get_active_uris_for_a_type.return_value = iter([
+            'acct:elephant@nomouse.pls'
+        ])
+
+        assert rt._reply_subscribers() == set(['acct:elephant@nomouse.pls'])
+        assert rt._reply_subscribers() == set(['acct:elephant@nomouse.pls'])
+        mock_subs.get_active_uris_for_a_type.assert_called_once_with(
+            REPLY_TYPE)
+
+
+@patch.dict(rt._subscribers_cache, {'uris': frozenset(), 'timestamp': 0})
+def test_reply_subscribers_are_reloaded_after_the_ttl():
+    with patch('h.notification.reply_template.Subscriptions') as mock_subs:
+        mock_subs.get_active_uris_for_a_type.return_value = []
+        with patch('h.notification.reply_template.time') as mock_time:
+            mock_time.time.return_value = 1000
+            rt._reply_subscribers()
+            mock_time.time.return_value = 1000 + rt.SUBSCRIBERS_CACHE_TTL + 1
+            rt._reply_subscribers()
+
+        assert mock_subs.get_active_uris_for_a_type.call_count == 2
 
 
 class MockSubscription(Mock):
@@ -360,15 +421,17 @@ class MockSubscription(Mock):
         }
 
 
-def test_check_conditions_false_stops_sending():
+@patch('h.notification.reply_template._reply_subscribers')
+def test_check_conditions_false_stops_sending(mock_subscribers):
     """If the check conditions() returns False, no notifications are generated"""
+    mock_subscribers.return_value = frozenset(['acct:elephant@nomouse.pls'])
     with patch('h.notification.reply_template.Annotation') as mock_annotation:
         mock_annotation.fetch = MagicMock(side_effect=fake_fetch)
         request = _create_request()
 
         annotation = store_fake_data[1]
         with patch('h.notification.reply_template.Subscriptions') as mock_subs:
-            mock_subs.get_active_subscriptions_for_a_type.return_value = [
+            mock_subs.get_templates_for_uri_and_type.return_value = [
                 MockSubscription(id=1, uri='acct:elephant@nomouse.pls')
             ]
             with patch('h.notification.reply_template.check_conditions') as mock_conditions:
@@ -378,15 +441,17 @@ def test_check_conditions_false_stops_sending():
                     msgs.next()
 
 
-def test_send_if_everything_is_okay():
+@patch('h.notification.reply_template._reply_subscribers')
+def test_send_if_everything_is_okay(mock_subscribers):
     """Test whether we generate notifications if every condition is okay"""
+    mock_subscribers.return_value = frozenset(['acct:elephant@nomouse.pls'])
     with patch('h.notification.reply_template.Annotation') as mock_annotation:
         mock_annotation.fetch = MagicMock(side_effect=fake_fetch)
         request = _create_request()
 
         annotation = store_fake_data[1]
         with patch('h.notification.reply_template.Subscriptions') as mock_subs:
-            mock_subs.get_active_subscriptions_for_a_type.return_value = [
+            mock_subs.get_templates_for_uri_and_type.return_value = [
                 MockSubscription(id=1, uri='acct:elephant@nomouse.pls')
             ]
             with patch('h.notification.reply_template.check_conditions') as mock_conditions:
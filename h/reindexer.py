@@ -1,11 +1,81 @@
+import itertools
+
 import annotator.reindexer
+from elasticsearch import helpers
 
 from h.models import Annotation, Document
 
+# The number of documents to fetch from each shard per scroll request when
+# reading the old index, and how long (in seconds) to wait for the scan to
+# start.
+SCAN_SIZE = 1000
+SCAN_TIMEOUT = 60
+
 
 class Reindexer(annotator.reindexer.Reindexer):
     es_models = Annotation, Document
 
+    def __init__(self, conn, interactive=False, workers=4, chunk_size=500):
+        super(Reindexer, self).__init__(conn, interactive=interactive)
+        self.workers = workers
+        self.chunk_size = chunk_size
+
+    def reindex(self, old_index, new_index):
+        """Reindex documents using the current mappings.
+
+        Unlike annotator-store's reindexer, which writes one bulk request at
+        a time, this sends up to ``self.workers`` bulk requests of
+        ``self.chunk_size`` documents to Elasticsearch concurrently. Failed
+        documents are counted rather than raised, as with the stats_only
+        mode of elasticsearch-py's reindex() helper that annotator-store uses.
+
+        :returns: a (success, failed) tuple of document counts
+        :rtype: tuple
+
+        """
+        # Everything up to the reindexing itself is copied from
+        # annotator.reindexer.Reindexer.reindex(), which doesn't split the
+        # index checks and creation out into a method we could call, so keep
+        # the two in step when upgrading annotator-store.
+        conn = self.conn
+
+        if not conn.indices.exists(old_index):
+            raise ValueError("Index {0} does not exist!".format(old_index))
+
+        if conn.indices.exists(new_index):
+            self._print("Index {0} already exists. "
+                        "The mapping will not be changed.".format(new_index))
+        else:
+            # Create the new index with (presumably) new mapping config
+            conn.indices.create(new_index, body=self.get_index_config())
+
+        self._print("Reindexing {0} to {1}...".format(old_index, new_index))
+        # Without a size Elasticsearch returns only 10 hits per shard for each
+        # scroll request.
+        docs = helpers.scan(conn,
+                            index=old_index,
+                            fields=('_source', '_parent', '_routing',
+                                    '_timestamp'),
+                            size=SCAN_SIZE,
+                            request_timeout=SCAN_TIMEOUT)
+        actions = _change_doc_index(docs, new_index)
+
+        # parallel_bulk() reads all of its actions into memory before it
+        # starts, so feed it one round of chunks at a time.
+        success = failed = 0
+        for batch in _batches(actions, self.workers * self.chunk_size):
+            for ok, _ in helpers.parallel_bulk(conn, batch,
+                                               thread_count=self.workers,
+                                               chunk_size=self.chunk_size,
+                                               raise_on_error=False):
+                if ok:
+                    success += 1
+                else:
+                    failed += 1
+        self._print("Reindexing done. {0} documents reindexed, "
+                    "{1} failed.".format(success, failed))
+        return success, failed
+
     def get_index_config(self):
         analysis = {}
         for model in self.es_models:
@@ -22,3 +92,27 @@ class Reindexer(annotator.reindexer.Reindexer):
         index_config['settings'] = {'analysis': analysis}
 
         return index_config
+
+
+def _change_doc_index(hits, index):
+    """Turn scanned hits into bulk index actions for the given index.
+
+    This is a copy of the function of the same name that is private to
+    elasticsearch.helpers.reindex().
+
+    """
+    for hit in hits:
+        hit['_index'] = index
+        if 'fields' in hit:
+            hit.update(hit.pop('fields'))
+        yield hit
+
+
+def _batches(iterable, size):
+    """Split iterable into lists of at most size items."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
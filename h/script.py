@@ -75,15 +75,26 @@ def reindex(args):
     paster.setup_logging(args.config_uri)
     env = paster.bootstrap(args.config_uri)
 
-    if 'es.host' in env['registry'].settings:
-        host = env['registry'].settings['es.host']
+    settings = env['registry'].settings
+
+    if 'es.host' in settings:
+        host = settings['es.host']
         conn = Elasticsearch([host])
     else:
         conn = Elasticsearch()
 
-    r = reindexer.Reindexer(conn, interactive=True)
+    r = reindexer.Reindexer(conn,
+                            interactive=True,
+                            workers=int(settings.get('es.bulk.workers', 4)),
+                            chunk_size=int(settings.get('es.bulk.chunk_size',
+                                                        500)))
+
+    _, failed = r.reindex(args.old_index, args.new_index)
 
-    r.reindex(args.old_index, args.new_index)
+    if failed:
+        print('{0} documents failed to reindex, not moving any alias.'
+              .format(failed), file=sys.stderr)
+        sys.exit(1)
 
     if args.alias is not None:
         r.alias(args.new_index, args.alias)
@@ -1,7 +1,5 @@
 # -*- coding: utf-8 -*-
 import base64
-import copy
-import json
 import logging
 import operator
 import random
@@ -26,6 +24,13 @@ from .api.auth import get_user  # FIXME: should not import from .api
 from annotator import document
 from .models import Annotation
 
+# Every annotation event is decoded once and re-encoded once per broadcast,
+# so use the faster ujson when it's installed.
+try:
+    import ujson as json
+except ImportError:
+    import json
+
 log = logging.getLogger(__name__)
 
 
@@ -111,39 +116,14 @@ class FilterToElasticFilter(object):
             self.query['filter']['script'] = '"script": ' + scripts
 
     @staticmethod
-    def equals(field, value):
-        if isinstance(value, list):
-            return {"terms": {field: value}}
-        else:
-            return {"term": {field: value}}
-
-    @staticmethod
-    def one_of(field, value):
-        if isinstance(value, list):
-            return {"terms": {field: value}}
-        else:
-            return {"term": {field: value}}
-
-    @staticmethod
-    def first_of(field, value):
-        if isinstance(value, list):
-            return {"terms": {field: value}}
-        else:
-            return {"term": {field: value}}
-
-    @staticmethod
-    def match_of(field, value):
+    def _term_query(field, value):
         if isinstance(value, list):
             return {"terms": {field: value}}
         else:
             return {"term": {field: value}}
 
-    @staticmethod
-    def matches(field, value):
-        if isinstance(value, list):
-            return {"terms": {field: value}}
-        else:
-            return {"term": {field: value}}
+    # All of the matching operators translate to the same term(s) query.
+    equals = one_of = first_of = match_of = matches = _term_query
 
     @staticmethod
     def lt(field, value):
@@ -325,8 +305,9 @@ class FilterHandler(object):
     def evaluate_clause(self, clause, target):
         if isinstance(clause['field'], list):
             for field in clause['field']:
-                copied = copy.deepcopy(clause)
-                copied['field'] = field
+                # Only 'field' differs between the per-field clauses, so a
+                # shallow copy is enough: the rest of the clause is read-only.
+                copied = dict(clause, field=field)
                 result = self.evaluate_clause(copied, target)
                 if result:
                     return True
@@ -556,10 +537,14 @@ def broadcast_from_queue(queue, sockets):
         data_in = json.loads(message.body)
         action = data_in['action']
         annotation = Annotation(**data_in['annotation'])
-        payload = _annotation_packet([annotation], action)
-        data_out = json.dumps(payload)
+        data_out = None
         for socket in list(sockets):
             if should_send_event(socket, annotation, data_in):
+                # Only serialize the packet once some socket wants it: most
+                # events (all reads, for a start) are sent to nobody.
+                if data_out is None:
+                    payload = _annotation_packet([annotation], action)
+                    data_out = json.dumps(payload)
                 socket.send(data_out)
 
 
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""Defines unit tests for h.reindexer."""
+from mock import MagicMock, patch
+import pytest
+
+from h import reindexer
+
+
+@patch('h.reindexer.helpers')
+def test_reindex_raises_if_old_index_is_missing(helpers):
+    conn = MagicMock()
+    conn.indices.exists.return_value = False
+
+    with pytest.raises(ValueError):
+        reindexer.Reindexer(conn).reindex('old', 'new')
+
+
+@patch('h.reindexer.helpers')
+def test_reindex_bulk_indexes_into_new_index_in_parallel(helpers):
+    conn = MagicMock()
+    helpers.scan.return_value = [
+        {'_id': str(i), '_index': 'old', '_source': {}} for i in range(5)
+    ]
+    helpers.parallel_bulk.return_value = []
+
+    reindexer.Reindexer(conn, workers=2, chunk_size=1).reindex('old', 'new')
+
+    # 5 documents in rounds of workers * chunk_size = 2
+    assert helpers.parallel_bulk.call_count == 3
+    for call in helpers.parallel_bulk.call_args_list:
+        args, kwargs = call
+        assert all(doc['_index'] == 'new' for doc in args[1])
+        assert kwargs == {'thread_count': 2,
+                          'chunk_size': 1,
+                          'raise_on_error': False}
+
+
+@patch('h.reindexer.helpers')
+def test_reindex_moves_scanned_fields_into_the_action(helpers):
+    conn = MagicMock()
+    helpers.scan.return_value = [
+        {'_id': '1', '_index': 'old', 'fields': {'_routing': 'foo'}}
+    ]
+    helpers.parallel_bulk.return_value = []
+
+    reindexer.Reindexer(conn).reindex('old', 'new')
+
+    batch = helpers.parallel_bulk.call_args[0][1]
+    assert batch == [{'_id': '1', '_index': 'new', '_routing': 'foo'}]
+
+
+@patch('h.reindexer.helpers')
+def test_reindex_scans_in_large_pages(helpers):
+    conn = MagicMock()
+    helpers.scan.return_value = []
+
+    reindexer.Reindexer(conn).reindex('old', 'new')
+
+    kwargs = helpers.scan.call_args[1]
+    assert kwargs['index'] == 'old'
+    assert kwargs['size'] == reindexer.SCAN_SIZE
+    assert kwargs['request_timeout'] == reindexer.SCAN_TIMEOUT
+
+
+@patch('h.reindexer.helpers')
+def test_reindex_counts_successes_and_failures_across_batches(helpers):
+    conn = MagicMock()
+    helpers.scan.return_value = [
+        {'_id': str(i), '_index': 'old', '_source': {}} for i in range(3)
+    ]
+    helpers.parallel_bulk.side_effect = [
+        [(True, {}), (False, {})],
+        [(True, {})],
+    ]
+
+    result = reindexer.Reindexer(conn, workers=2, chunk_size=1).reindex(
+        'old', 'new')
+
+    assert result == (2, 1)
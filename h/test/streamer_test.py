@@ -11,6 +11,7 @@ from mock import MagicMock, Mock
 from mock import patch
 from pyramid.testing import DummyRequest
 
+from h.streamer import FilterHandler
 from h.streamer import FilterToElasticFilter
 from h.streamer import WebSocket
 from h.streamer import should_send_event
@@ -187,6 +188,30 @@ def test_operator_call():
     assert query['term']['text'] == expected
 
 
+def test_matching_operators_generate_term_queries():
+    for operator in ('equals', 'one_of', 'first_of', 'match_of', 'matches'):
+        method = getattr(FilterToElasticFilter, operator)
+        assert method('tags', 'foo') == {'term': {'tags': 'foo'}}
+        assert method('tags', ['foo', 'bar']) == {
+            'terms': {'tags': ['foo', 'bar']}}
+
+
+def test_filter_handler_clause_with_multiple_fields():
+    clause = {
+        'field': ['/text', '/quote'],
+        'operator': 'equals',
+        'value': 'foo',
+        'options': {}
+    }
+    handler = FilterHandler({'match_policy': 'include_any',
+                             'clauses': [clause],
+                             'actions': {}})
+
+    assert handler.evaluate_clause(clause, {'text': 'bar', 'quote': 'foo'})
+    assert not handler.evaluate_clause(clause, {'text': 'bar'})
+    assert clause['field'] == ['/text', '/quote']
+
+
 def test_websocket_bad_origin(config):
     config.registry.settings.update({'origins': 'http://good'})
     config.include('h.streamer')
@@ -317,6 +342,20 @@ class TestBroadcast(unittest.TestCase):
         broadcast_from_queue(self.queue, [sock])
         assert sock.send.called is False
 
+    @patch('h.streamer.json.dumps')
+    def test_no_serialization_when_no_socket_receives_event(self, dumps):
+        self.should.return_value = False
+        sock = FakeSocket('pidgeon')
+        broadcast_from_queue(self.queue, [sock])
+        assert dumps.called is False
+
+    @patch('h.streamer.json.dumps')
+    def test_serializes_each_event_once(self, dumps):
+        self.should.return_value = True
+        socks = [FakeSocket('giraffe'), FakeSocket('elephant')]
+        broadcast_from_queue(self.queue, socks)
+        assert dumps.call_count == len(self.messages)
+
 
 class TestShouldSendEvent(unittest.TestCase):
     def setUp(self):
@@ -1,3 +1,5 @@
+import mock
+
 from h import util
 
 
@@ -9,3 +11,55 @@ def test_split_user():
 def test_split_user_no_match():
     parts = util.split_user("donkeys")
     assert parts is None
+
+
+def test_split_user_no_domain():
+    parts = util.split_user("acct:seanh")
+    assert parts is None
+
+
+def test_split_user_no_username():
+    parts = util.split_user("acct:@hypothes.is")
+    assert parts is None
+
+
+def test_bounded_cache_creates_each_value_once():
+    create = mock.Mock(return_value={'foo': 'bar'})
+    cache = util.BoundedCache(2)
+
+    first = cache.get('key', create)
+    second = cache.get('key', create)
+
+    assert create.call_count == 1
+    assert first == second == {'foo': 'bar'}
+
+
+def test_bounded_cache_returns_shallow_copies():
+    cache = util.BoundedCache(2)
+    nested = {'baz': 1}
+
+    first = cache.get('key', lambda: {'foo': nested})
+    first['foo'] = 'replaced'
+    second = cache.get('key', lambda: {})
+
+    assert second == {'foo': nested}
+    assert second['foo'] is nested
+
+
+def test_bounded_cache_is_emptied_when_full():
+    cache = util.BoundedCache(2)
+    cache.get('one', dict)
+    cache.get('two', dict)
+
+    cache.get('three', dict)
+
+    assert len(cache) == 1
+
+
+def test_bounded_cache_clear():
+    cache = util.BoundedCache(2)
+    cache.get('one', dict)
+
+    cache.clear()
+
+    assert len(cache) == 0
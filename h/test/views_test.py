@@ -6,6 +6,7 @@ import json
 import unittest
 import mock
 
+from elasticsearch import exceptions as elasticsearch_exceptions
 import pyramid
 from pyramid import testing
 import pytest
@@ -141,7 +142,8 @@ class TestStreamAtomView(object):
         request = mock.MagicMock()
 
         def side_effect(arg):
-            return {"h.feed.title": title}.get(arg)
+            return {"h.api_url": "https://example.com/api",
+                    "h.feed.title": title}.get(arg)
 
         request.registry.settings.get.side_effect = side_effect
 
@@ -155,7 +157,8 @@ class TestStreamAtomView(object):
         request = mock.MagicMock()
 
         def side_effect(arg):
-            return {"h.feed.subtitle": subtitle}.get(arg)
+            return {"h.api_url": "https://example.com/api",
+                    "h.feed.subtitle": subtitle}.get(arg)
 
         request.registry.settings.get.side_effect = side_effect
 
@@ -259,3 +262,67 @@ class TestStreamAtomView(object):
 
         with pytest.raises(pyramid.httpexceptions.HTTPBadGateway):
             views.stream_atom(request)
+
+    @mock.patch("h.api.search.search")
+    def test_it_raises_httpserviceunavailable_for_in_process_connectionerror(
+            self, search):
+        request = mock.MagicMock()
+        request.registry.feature.return_value = True
+        request.registry.settings = {}
+        search.side_effect = elasticsearch_exceptions.ConnectionError(
+            "N/A", "refused", None)
+
+        with pytest.raises(pyramid.httpexceptions.HTTPServiceUnavailable):
+            views.stream_atom(request)
+
+    @mock.patch("h.api.search.search")
+    def test_it_raises_httpgatewaytimeout_for_in_process_connectiontimeout(
+            self, search):
+        request = mock.MagicMock()
+        request.registry.feature.return_value = True
+        request.registry.settings = {}
+        search.side_effect = elasticsearch_exceptions.ConnectionTimeout(
+            "TIMEOUT", "slow", None)
+
+        with pytest.raises(pyramid.httpexceptions.HTTPGatewayTimeout):
+            views.stream_atom(request)
+
+    @mock.patch("h.api.search.search")
+    def test_it_raises_httpbadgateway_for_in_process_transporterror(
+            self, search):
+        request = mock.MagicMock()
+        request.registry.feature.return_value = True
+        request.registry.settings = {}
+        search.side_effect = elasticsearch_exceptions.TransportError(
+            500, "SearchPhaseExecutionException", {})
+
+        with pytest.raises(pyramid.httpexceptions.HTTPBadGateway):
+            views.stream_atom(request)
+
+    @mock.patch("h.api.search.search")
+    def test_it_searches_in_process_when_the_api_is_served_by_this_app(
+            self, search):
+        request = mock.MagicMock()
+        request.registry.feature.return_value = True
+        request.registry.settings = {}
+        request.params = {"tags": "JavaScript"}
+
+        data = views.stream_atom(request)
+
+        assert not request.api_client.get.called
+        params = search.call_args[0][0]
+        assert params["tags"] == "JavaScript"
+        assert params["limit"] == 1000
+        assert data["annotations"] == search.return_value["rows"]
+
+    @mock.patch("h.api.search.search")
+    def test_it_uses_the_api_client_when_an_api_url_is_configured(
+            self, search):
+        request = mock.MagicMock()
+        request.registry.feature.return_value = True
+        request.registry.settings = {"h.api_url": "https://example.com/api"}
+
+        views.stream_atom(request)
+
+        assert request.api_client.get.called
+        assert not search.called
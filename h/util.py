@@ -1,5 +1,4 @@
 """Some shared utility functions."""
-import re
 
 
 def split_user(username):
@@ -9,8 +8,48 @@ def split_user(username):
     ("seanh", "hypothes.is").
 
     """
-    match = re.match(r'^acct:([^@]+)@(.*)$', username)
-    if match:
-        return match.groups()
-    # Passed username didn't match
-    return None
+    if not username.startswith('acct:'):
+        return None
+    user, at, domain = username[len('acct:'):].partition('@')
+    if not user or not at:
+        # Passed username didn't match
+        return None
+    return (user, domain)
+
+
+class BoundedCache(object):
+
+    """A cache of dicts that holds at most ``maxsize`` entries.
+
+    When the cache is full it's emptied before the next entry is added,
+    which keeps memory use bounded without tracking how recently each entry
+    was used.
+
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, create):
+        """Return the dict cached for key, calling create() if there isn't one.
+
+        A shallow copy is returned so that callers can replace its top-level
+        items without affecting the cached dict. Any nested values are shared
+        and must not be modified.
+
+        """
+        try:
+            value = self._entries[key]
+        except KeyError:
+            if len(self._entries) >= self.maxsize:
+                self._entries.clear()
+            value = self._entries[key] = create()
+        return dict(value)
+
+    def clear(self):
+        """Remove all entries from the cache."""
+        self._entries.clear()
@@ -8,7 +8,10 @@ from pyramid.events import ContextFound
 from pyramid.view import forbidden_view_config, notfound_view_config
 from pyramid.view import view_config
 from pyramid import i18n
+from elasticsearch import exceptions as elasticsearch_exceptions
+from webob import multidict
 
+import h.api.search
 from . import session
 from .models import Annotation
 from .resources import Application, Stream
@@ -163,9 +166,37 @@ def stream_atom(request):
     if not 0 <= params["limit"] <= max_limit:
         params["limit"] = max_limit
 
+    return dict(
+        annotations=_search_annotations(request, params),
+        atom_url=request.route_url("stream_atom"),
+        html_url=request.route_url("stream"),
+        title=request.registry.settings.get("h.feed.title"),
+        subtitle=request.registry.settings.get("h.feed.subtitle"))
+
+
+def _search_annotations(request, params):
+    """Return the public annotations matching the given search API params.
+
+    If the API is served by this app (and not by a separately configured
+    h.api_url) search it directly, rather than making an HTTP request back
+    to ourselves and decoding the JSON response.
+
+    """
+    registry = request.registry
+    if registry.feature('api') and not registry.settings.get('h.api_url'):
+        try:
+            return h.api.search.search(multidict.MultiDict(params))["rows"]
+        # ConnectionTimeout is a subclass of ConnectionError, and both are
+        # subclasses of TransportError, so the order here matters.
+        except elasticsearch_exceptions.ConnectionTimeout as err:
+            raise httpexceptions.HTTPGatewayTimeout(err)
+        except elasticsearch_exceptions.ConnectionError as err:
+            raise httpexceptions.HTTPServiceUnavailable(err)
+        except elasticsearch_exceptions.TransportError as err:
+            raise httpexceptions.HTTPBadGateway(err)
+
     try:
-        annotations = request.api_client.get(
-            "/search", params=params)["rows"]
+        return request.api_client.get("/search", params=params)["rows"]
     except api_client.ConnectionError as err:
         raise httpexceptions.HTTPServiceUnavailable(err)
     except api_client.Timeout as err:
@@ -173,13 +204,6 @@ def stream_atom(request):
     except api_client.APIError as err:
         raise httpexceptions.HTTPBadGateway(err)
 
-    return dict(
-        annotations=annotations,
-        atom_url=request.route_url("stream_atom"),
-        html_url=request.route_url("stream"),
-        title=request.registry.settings.get("h.feed.title"),
-        subtitle=request.registry.settings.get("h.feed.subtitle"))
-
 
 @forbidden_view_config(renderer='h:templates/notfound.html')
 @notfound_view_config(renderer='h:templates/notfound.html')